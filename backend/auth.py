@@ -3,6 +3,18 @@ Authentication utilities for JWT token generation, password verification, and au
 This module provides Pydantic models for login requests/responses and helper functions for bcrypt password hashing.
 """
 import os
+import asyncio
+import base64
+import calendar
+import functools
+import hashlib
+import hmac
+import multiprocessing
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
@@ -10,12 +22,51 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from pydantic import BaseModel
 import bcrypt
+import orjson
+from cachetools import TTLCache
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-key-change-in-production-12345")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
+# Invariant parts of every HS256 token, computed once instead of on each jwt.encode call
+_SIGNING_KEY = JWT_SECRET_KEY.encode('utf-8')
+_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+# Recently verified credentials, so a repeated login skips the bcrypt work.
+# Maps sha256(password | hash) -> time it was verified. Only successful checks are stored.
+VERIFY_CACHE_TTL_SECONDS = 60
+VERIFY_CACHE_MAX_ENTRIES = 1024
+_verify_cache: dict = {}
+_verify_cache_lock = threading.Lock()
+
+# Shape of a bcrypt hash bcrypt.checkpw accepts: $2a$/$2b$/$2y$, cost 04-31, 53 chars of salt + digest
+_BCRYPT_HASH_RE = re.compile(rb"\A\$2[aby]\$(0[4-9]|[12][0-9]|3[01])\$[./A-Za-z0-9]{53}\Z")
+
+# bcrypt cost for new hashes; set BCRYPT_ROUNDS to match the stored user hashes
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Cost of the user hashes actually seen at login. Logins naming an unknown user are checked
+# against a dummy hash of this same cost, so they take as long as a wrong password
+# and don't reveal which usernames exist.
+_stored_hash_rounds = BCRYPT_ROUNDS
+
+# Dedicated worker processes for bcrypt, so concurrent logins run on all cores
+# instead of contending for the GIL and the shared request threadpool.
+# Workers start from a clean forkserver rather than forking the multi-threaded app
+# (threadpool, event loop, open MySQL sockets); preloading this module there keeps startup cheap.
+_bcrypt_mp_context = multiprocessing.get_context("forkserver")
+_bcrypt_mp_context.set_forkserver_preload([__name__])
+# CPUs this process may actually run on (the container's set), not the host's count
+_BCRYPT_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+BCRYPT_POOL = ProcessPoolExecutor(max_workers=_BCRYPT_WORKERS, mp_context=_bcrypt_mp_context)
+
+# Decoded payloads of recently verified bearer tokens, so the many API calls a page makes
+# with the same token skip base64 + HMAC + JSON decoding. Entries are also checked against exp.
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
+_token_cache_lock = threading.Lock()
+
 security = HTTPBearer()
 
 # Pydantic Models
@@ -39,17 +90,79 @@ class LoginResponse(BaseModel):
 
 
 # Password utilities
-def verify_password(plain_password: str, password_hash: str) -> bool:
-    """Verify a plain password against a bcrypt hash."""
-    try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), password_hash.encode('utf-8'))
-    except Exception:
+def _cache_key(plain_bytes: bytes, password_hash: bytes) -> bytes:
+    return hashlib.sha256(plain_bytes + b"|" + password_hash).digest()
+
+
+def _is_cached(key: bytes, now: float) -> bool:
+    with _verify_cache_lock:
+        verified_at = _verify_cache.get(key)
+        return verified_at is not None and now - verified_at < VERIFY_CACHE_TTL_SECONDS
+
+
+def _remember(key: bytes, now: float) -> None:
+    with _verify_cache_lock:
+        if len(_verify_cache) >= VERIFY_CACHE_MAX_ENTRIES:
+            # Drop expired entries first, then the oldest ones if still full
+            for k in [k for k, ts in _verify_cache.items() if now - ts >= VERIFY_CACHE_TTL_SECONDS]:
+                del _verify_cache[k]
+            while len(_verify_cache) >= VERIFY_CACHE_MAX_ENTRIES:
+                del _verify_cache[next(iter(_verify_cache))]
+        _verify_cache[key] = now
+
+
+@functools.lru_cache(maxsize=None)
+def _dummy_hash(rounds: int) -> bytes:
+    # Built lazily (once per cost, per worker) so importing this module stays cheap
+    return bcrypt.hashpw(secrets.token_hex(16).encode('ascii'), bcrypt.gensalt(rounds=rounds))
+
+
+def _check_dummy(plain_bytes: bytes, rounds: int) -> bool:
+    # Runs in BCRYPT_POOL workers; never matches
+    return _checkpw(plain_bytes, _dummy_hash(rounds))
+
+
+def _checkpw(plain_bytes: bytes, password_hash: bytes) -> bool:
+    # Module-level so it can be pickled and run in BCRYPT_POOL workers.
+    # Malformed hashes are rejected up front instead of relying on bcrypt raising.
+    if not _BCRYPT_HASH_RE.match(password_hash):
         return False
+    return bcrypt.checkpw(plain_bytes, password_hash)
+
+
+async def verify_password_async(plain_password: str, password_hash: bytes) -> bool:
+    """
+    Verify a plain password against a bcrypt hash (as ASCII bytes), reusing recent successful checks.
+    bcrypt runs in BCRYPT_POOL so it doesn't tie up the event loop or threadpool.
+    """
+    global _stored_hash_rounds
+    match = _BCRYPT_HASH_RE.match(password_hash)
+    if match:
+        _stored_hash_rounds = int(match.group(1))
+
+    plain_bytes = plain_password.encode('utf-8')
+    key = _cache_key(plain_bytes, password_hash)
+    now = time.monotonic()
+    if _is_cached(key, now):
+        return True
+
+    loop = asyncio.get_running_loop()
+    ok = await loop.run_in_executor(BCRYPT_POOL, _checkpw, plain_bytes, password_hash)
+    # Only cache successful checks so typos always go through bcrypt
+    if ok:
+        _remember(key, now)
+    return ok
+
+
+async def verify_unknown_user(plain_password: str) -> None:
+    """Spend the same bcrypt work as a wrong password, for logins that name no existing user."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(BCRYPT_POOL, _check_dummy, plain_password.encode('utf-8'), _stored_hash_rounds)
 
 
 def hash_password(plain_password: str) -> str:
     """Hash a plain password using bcrypt."""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(plain_password.encode('utf-8'), salt).decode('utf-8')
 
 
@@ -58,8 +171,11 @@ def create_access_token(data: dict) -> str:
     """Create a JWT access token with 24-hour expiration."""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    to_encode.update({"exp": calendar.timegm(expire.utctimetuple())})
+    payload_b64 = base64.urlsafe_b64encode(orjson.dumps(to_encode)).rstrip(b"=")
+    signing_input = _HEADER_B64 + b"." + payload_b64
+    signature = hmac.new(_SIGNING_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + base64.urlsafe_b64encode(signature).rstrip(b"=")).decode('ascii')
 
 
 def verify_token(token: str) -> dict:
@@ -87,4 +203,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         return {"user_id": user["sub"], "role": user["role"]}
     """
     token = credentials.credentials
-    return verify_token(token)
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+
+    payload = verify_token(token)
+    with _token_cache_lock:
+        _token_cache[token] = payload
+    return payload
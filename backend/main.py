@@ -5,13 +5,27 @@
     4. Each endpoint executes SQL queries to retrieve data from the database and returns it in a structured format for the frontend to consume.
 """
 import os
-from typing import Optional, List, Dict, Any
+import functools
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator
 from fastapi import FastAPI, Query, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
-import pymysql
-from auth import LoginRequest, LoginResponse, UserResponse, verify_password, create_access_token
+import anyio
+import msgspec
+import orjson
+import MySQLdb
+import MySQLdb.cursors
+from cachetools import TTLCache
+from dbutils.pooled_db import PooledDB
+from starlette.concurrency import run_in_threadpool
+from auth import LoginRequest, LoginResponse, UserResponse, BCRYPT_POOL, verify_password_async, verify_unknown_user, create_access_token
 load_dotenv()
 
 # This is a simple FastAPI backend that connects to a MySQL database to serve logistics-related data.
@@ -24,7 +38,14 @@ MYSQL_DB = os.getenv("MYSQL_DB")
 if not all([MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB]):
     raise RuntimeError("Missing MYSQL_* env vars in .env")
 
-app = FastAPI(title="Logistics Local APIs (MySQL)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop the bcrypt worker processes on shutdown
+    BCRYPT_POOL.shutdown(wait=False, cancel_futures=True)
+
+# orjson encodes the (already jsonable_encoder-converted) rows in C, which matters for the list endpoints
+app = FastAPI(title="Logistics Local APIs (MySQL)", default_response_class=ORJSONResponse, lifespan=lifespan)
 app.mount("/pod_docs", StaticFiles(directory="static/POD_documents"), name="pod_docs")
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -38,62 +59,180 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Connection settings shared by the pool and the dedicated export connections
+DB_CONFIG = dict(
+    host=MYSQL_HOST,
+    port=MYSQL_PORT,
+    user=MYSQL_USER,
+    password=MYSQL_PASSWORD,
+    database=MYSQL_DB,
+    charset="utf8mb4",  # same as PyMySQL's default; mysqlclient would otherwise use the client library's
+)
+
+# Connection pool shared by all requests, so each call reuses an open MySQL connection
+# instead of paying the TCP + auth handshake every time.
+POOL = PooledDB(
+    creator=MySQLdb,  # mysqlclient: C driver, rows are decoded in libmysqlclient rather than Python
+    mincached=5,
+    maxcached=10,
+    maxconnections=20,
+    blocking=True,  # wait for a free connection instead of failing when the pool is exhausted
+    ping=1,  # check the connection is alive before handing it out
+    cursorclass=MySQLdb.cursors.DictCursor, # return results as dicts instead of tuples
+    **DB_CONFIG,
+)
+
+# Streaming exports hold a connection for as long as the client takes to read them,
+# so they use their own connections (never the pool's) and only a few may run at once.
+EXPORT_MAX_CONCURRENT = 4
+EXPORT_SLOTS = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)
+
 # Helper functions to interact with the MySQL database
+# Queries go over the text protocol on purpose: mysqlclient interpolates parameters client-side,
+# and emulating it with PREPARE / SET @p / EXECUTE costs more roundtrips than the parse it saves.
+# Reusing pooled connections is where the per-request savings come from.
 def fetch_all(sql: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-    conn = pymysql.connect(
-        host=MYSQL_HOST,
-        port=MYSQL_PORT,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DB,
-        cursorclass=pymysql.cursors.DictCursor, # return results as dicts instead of tuples
-    )
+    conn = POOL.connection()
     try:
         with conn.cursor() as cur:
             cur.execute(sql, params or ())
             return cur.fetchall()
     finally:
-        conn.close()
+        conn.close()  # returns the connection to the pool
 
 def fetch_one(sql: str, params: tuple) -> Optional[Dict[str, Any]]:
     rows = fetch_all(sql, params)
     return rows[0] if rows else None
 
+def fetch_sets(statements: List[str]) -> List[List[Dict[str, Any]]]:
+    # Runs several statements in one roundtrip and returns each result set in order
+    # (mysqlclient enables multi-statement support on every connection by default).
+    # The batch is sent as a single string with no parameters, so none of the statements may use %s.
+    assert not any("%s" in sql for sql in statements), "fetch_sets statements can't take parameters"
+    conn = POOL.connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(";".join(statements))
+            result_sets = [list(cur.fetchall())]
+            while cur.nextset():
+                result_sets.append(list(cur.fetchall()))
+            return result_sets
+    finally:
+        conn.close()  # returns the connection to the pool
+
+def _json_default(value: Any) -> Any:
+    # orjson handles dates natively; DECIMAL columns need converting
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+def fetch_stream(sql: str, params: Optional[tuple] = None, chunk: int = 100) -> Iterator[bytes]:
+    # Server-side cursor: rows are read from MySQL in chunks instead of being buffered all at once.
+    # Uses a dedicated connection, so a slow reader never ties up a pooled one.
+    conn = MySQLdb.connect(cursorclass=MySQLdb.cursors.SSDictCursor, **DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, params or ())
+            while True:
+                rows = cur.fetchmany(chunk)
+                if not rows:
+                    break
+                # One body message per fetched chunk rather than one per row
+                yield b"".join(orjson.dumps(row, default=_json_default) + b"\n" for row in rows)
+    finally:
+        conn.close()
+
+async def iterate_stream(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    # Drives a blocking generator like fetch_stream from worker threads, and closes it there too:
+    # closing an unbuffered result early drains the remaining rows, which must not block the event loop.
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Shielded so the close still runs when the client disconnects and the response is cancelled
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(chunks.close)
+
+def fetch_all_tuples(sql: str, params: Optional[tuple] = None) -> List[tuple]:
+    # Plain cursor: rows come back as tuples, skipping the per-row dict that DictCursor builds
+    conn = POOL.connection()
+    try:
+        with conn.cursor(MySQLdb.cursors.Cursor) as cur:
+            cur.execute(sql, params or ())
+            return cur.fetchall()
+    finally:
+        conn.close()  # returns the connection to the pool
+
+def fetch_one_tuple(sql: str, params: tuple) -> Optional[tuple]:
+    rows = fetch_all_tuples(sql, params)
+    return rows[0] if rows else None
+
+# Short-lived cache for dashboard aggregates. Many clients poll these endpoints,
+# so the underlying table scans run once per TTL window instead of once per request.
+AGGREGATE_CACHE = TTLCache(maxsize=128, ttl=10)
+AGGREGATE_CACHE_LOCK = threading.Lock()
+
+def ttl_cached(func):
+    """Cache an endpoint's result in AGGREGATE_CACHE, keyed by endpoint name and query params."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        with AGGREGATE_CACHE_LOCK:
+            if key in AGGREGATE_CACHE:
+                return AGGREGATE_CACHE[key]
+        result = func(*args, **kwargs)
+        with AGGREGATE_CACHE_LOCK:
+            AGGREGATE_CACHE[key] = result
+        return result
+    return wrapper
+
 # Authentication endpoint for user login with JWT token generation
+LOGIN_USER_SQL = """
+    SELECT u.id, u.username, u.email, u.first_name, u.last_name, u.phone,
+           u.password_hash, u.is_active, r.role_code
+    FROM users u
+    JOIN roles r ON u.role_id = r.id
+    WHERE (u.username = %s OR u.email = %s)
+"""
+
 @app.post("/api/auth/login", response_model=LoginResponse)
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     """
     Authenticate user with username/email and password.
     Returns JWT access token and user data if credentials are valid.
     """
     # Query user from database with role information
-    user = fetch_one(
-        """
-        SELECT u.id, u.username, u.email, u.first_name, u.last_name, u.phone,
-               u.password_hash, u.is_active, r.role_code
-        FROM users u
-        JOIN roles r ON u.role_id = r.id
-        WHERE (u.username = %s OR u.email = %s)
-        """,
+    # DB access is blocking, so it still runs in the threadpool
+    row = await run_in_threadpool(
+        fetch_one_tuple,
+        LOGIN_USER_SQL,
         (req.username_or_email, req.username_or_email),
     )
 
-    # Check if user exists
-    if not user:
+    # Check if user exists (still paying for a bcrypt check, so timing matches a wrong password)
+    if not row:
+        await verify_unknown_user(req.password)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username/email or password",
         )
+    (user_id, username, email, first_name, last_name, phone,
+     password_hash, is_active, role_code) = row
 
     # Check if user account is active
-    if not user.get("is_active"):
+    if not is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive. Please contact administrator.",
         )
 
-    # Verify password
-    if not verify_password(req.password, user["password_hash"]):
+    # Verify password (bcrypt hashes are plain ASCII; a VARBINARY column already arrives as bytes)
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('ascii')
+    if not await verify_password_async(req.password, password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username/email or password",
@@ -101,42 +240,46 @@ def login(req: LoginRequest):
 
     # Create JWT token with user ID, username, and role
     token_data = {
-        "sub": str(user["id"]),  # subject = user ID
-        "username": user["username"],
-        "role": user["role_code"],
+        "sub": str(user_id),  # subject = user ID
+        "username": username,
+        "role": role_code,
     }
     access_token = create_access_token(token_data)
 
     # Prepare user response (exclude password_hash)
-    user_response = UserResponse(
-        id=user["id"],
-        username=user["username"],
-        email=user["email"],
-        first_name=user["first_name"],
-        last_name=user["last_name"],
-        role_code=user["role_code"],
-        phone=user.get("phone"),
+    # Fields come straight from our own query, so skip Pydantic validation
+    user_response = UserResponse.model_construct(
+        id=user_id,
+        username=username,
+        email=email,
+        first_name=first_name,
+        last_name=last_name,
+        role_code=role_code,
+        phone=phone,
     )
 
-    return LoginResponse(access_token=access_token, user=user_response)
+    return LoginResponse.model_construct(access_token=access_token, token_type="bearer", user=user_response)
 
 # /api/customers- This endpoint returns a list of all customers in the system, ordered by their ID.
+CUSTOMERS_SQL = "SELECT * FROM customers ORDER BY id"
+
 @app.get("/api/customers")
 def get_customers():
-    return fetch_all("SELECT * FROM customers ORDER BY id")
+    return fetch_all(CUSTOMERS_SQL)
 
 # /api/vendors- This endpoint returns a list of all vendors in the system, ordered by their ID.
+VENDORS_SQL = "SELECT * FROM vendors ORDER BY id"
+
 @app.get("/api/vendors")
 def get_vendors():
-    return fetch_all("SELECT * FROM vendors ORDER BY id")
+    return fetch_all(VENDORS_SQL)
 
 # /api/vendors/:id/performance
+VENDOR_PERFORMANCE_SQL = "SELECT * FROM vendor_performance WHERE vendor_id = %s ORDER BY calculation_date DESC LIMIT 1"
+
 @app.get("/api/vendors/{vendor_id}/performance")
 def get_vendor_performance(vendor_id: str):
-    row = fetch_one(
-        "SELECT * FROM vendor_performance WHERE vendor_id = %s ORDER BY calculation_date DESC LIMIT 1",
-        (vendor_id,),
-    )
+    row = fetch_one(VENDOR_PERFORMANCE_SQL, (vendor_id,))
     return row or {"vendor_id": vendor_id, "message": "No performance found"}
 
 
@@ -144,221 +287,283 @@ def get_vendor_performance(vendor_id: str):
     /api/exceptions/live- This endpoint returns a list of recent shipment exceptions, including the shipment ID, exception type, message, and when the exception was raised.
     The results are ordered by the most recent exceptions first and limited to a specified number (default 20).
 """
+EXCEPTIONS_LIVE_SQL = """
+    SELECT
+        id AS shipment_id,  -- Frontend expects 'shipment_id'
+        exception_type,
+        exception_notes AS message, -- Frontend expects 'message'
+        origin_city,    -- Fixes Dashboard '?'
+        destination_city,   -- Fixes Dashboard '?'
+        sort_ts AS raised_at -- Frontend expects 'raised_at'; sort_ts = COALESCE(last_status_update, updated_ts)
+    FROM shipments
+    WHERE has_exception = 1
+    ORDER BY sort_ts DESC -- served by ix_ship_exc_sort, no filesort
+    LIMIT %s
+"""
+
 @app.get("/api/exceptions/live")
 def get_exceptions_live(limit: int = 20):
-    return fetch_all(
-        """
-        SELECT
-            id AS shipment_id,  -- Frontend expects 'shipment_id'
-            exception_type,
-            exception_notes AS message, -- Frontend expects 'message'
-            origin_city,    -- Fixes Dashboard '?'
-            destination_city,   -- Fixes Dashboard '?'
-            COALESCE(last_status_update, updated_ts) AS raised_at -- Frontend expects 'raised_at'
-        FROM shipments
-        WHERE has_exception = 1
-        ORDER BY raised_at DESC
-        LIMIT %s
-        """,
-        (limit,),
-    )
+    return fetch_all(EXCEPTIONS_LIVE_SQL, (limit,))
 
 
 # /api/pod/search?q=... This endpoint allows searching for shipments based on the POD document URL, AWB number, or shipment ID.
+# AWB and POD URL matches use the ngram FULLTEXT indexes (see sql/indexes.sql) instead of '%q%' scans;
+# each branch uses its own index and the UNION merges the matching shipment ids.
+POD_SEARCH_SQL = """
+    SELECT s.*, a.awb_number
+    FROM (
+        SELECT s2.id
+        FROM awb_numbers a2
+        JOIN shipments s2 ON s2.awb_id = a2.id
+        WHERE MATCH(a2.awb_number) AGAINST (%s IN BOOLEAN MODE)
+        UNION
+        SELECT id FROM shipments WHERE MATCH(pod_document_url) AGAINST (%s IN BOOLEAN MODE)
+        UNION
+        SELECT id FROM shipments WHERE id = %s
+    ) m
+    JOIN shipments s ON s.id = m.id
+    JOIN awb_numbers a ON a.id = s.awb_id
+    ORDER BY COALESCE(s.pod_upload_timestamp, s.updated_ts) DESC
+    LIMIT %s
+"""
+
+# A 1-character query is shorter than the ngram token size and can't match the FULLTEXT
+# indexes, so it falls back to the plain substring scan.
+POD_SEARCH_LIKE_SQL = """
+    SELECT s.*, a.awb_number
+    FROM shipments s
+    JOIN awb_numbers a ON a.id = s.awb_id
+    WHERE a.awb_number LIKE %s
+        OR CAST(s.id AS CHAR) LIKE %s
+        OR s.pod_document_url LIKE %s
+    ORDER BY COALESCE(s.pod_upload_timestamp, s.updated_ts) DESC
+    LIMIT %s
+"""
+
 @app.get("/api/pod/search")
 def pod_search(q: str = Query(..., min_length=1), limit: int = 50):
-    like = f"%{q}%"
-    return fetch_all(
-        """
-        SELECT s.*, a.awb_number
-        FROM shipments s
-        JOIN awb_numbers a ON a.id = s.awb_id
-        WHERE a.awb_number LIKE %s
-            OR CAST(s.id AS CHAR) LIKE %s
-            OR s.pod_document_url LIKE %s
-        ORDER BY COALESCE(s.pod_upload_timestamp, s.updated_ts) DESC
-        LIMIT %s
-        """,
-        (like, like, like, limit),
-    )
+    if len(q) < 2:
+        like = f"%{q}%"
+        return fetch_all(POD_SEARCH_LIKE_SQL, (like, like, like, limit))
+
+    # Quoted phrase = the query's ngrams in sequence, i.e. a substring match
+    phrase = '"' + q.replace('"', '') + '"'
+    # isdecimal (not isdigit) so int() can't fail; 19 digits covers any BIGINT id
+    shipment_id = int(q) if q.isdecimal() and len(q) <= 19 else None
+    return fetch_all(POD_SEARCH_SQL, (phrase, phrase, shipment_id, limit))
 
 # /api/shipments- This endpoint returns a list of recent shipments with their current status, origin, destination, assigned vendor, and other relevant details.
+# Row shape of SHIPMENTS_LIST_SQL; field order must match the SELECT column order
+class ShipmentRow(msgspec.Struct):
+    shipment_id: int
+    awb_number: str
+    origin: Optional[str]
+    destination: Optional[str]
+    shipment_status: Optional[str]
+    current_hub_code: Optional[str]
+    vendor_id: Optional[int]
+    eta: Optional[date]
+    last_updated_ts: Optional[datetime]
+
+SHIPMENTS_LIST_SQL = """
+    SELECT
+        s.id AS shipment_id,    -- Matches 'shipment_id' in frontend
+        a.awb_number,
+        s.origin_city AS origin,    -- Matches 'origin' in frontend
+        s.destination_city AS destination,  -- Matches 'destination'
+        s.current_status AS shipment_status,
+        h.hub_code AS current_hub_code,
+        s.assigned_vendor_id AS vendor_id,
+        s.expected_delivery_date AS eta,
+        s.sort_ts AS last_updated_ts
+    FROM shipments s
+    JOIN awb_numbers a ON a.id = s.awb_id
+    LEFT JOIN hubs h ON h.id = s.current_hub_id
+    ORDER BY s.sort_ts DESC -- served by ix_ship_sort, no filesort
+    LIMIT %s
+"""
+
 @app.get("/api/shipments")
 def get_shipments(limit: int = 200):
-    return fetch_all(
-        """
-        SELECT
-            s.id AS shipment_id,    -- Matches 'shipment_id' in frontend
-            a.awb_number,
-            s.origin_city AS origin,    -- Matches 'origin' in frontend
-            s.destination_city AS destination,  -- Matches 'destination'
-            s.current_status AS shipment_status,
-            h.hub_code AS current_hub_code,
-            s.assigned_vendor_id AS vendor_id,
-            s.expected_delivery_date AS eta,
-            COALESCE(s.last_status_update, s.updated_ts) AS last_updated_ts
-        FROM shipments s
-        JOIN awb_numbers a ON a.id = s.awb_id
-        LEFT JOIN hubs h ON h.id = s.current_hub_id
-        ORDER BY COALESCE(s.last_status_update, s.updated_ts) DESC
-        LIMIT %s
-        """,
-        (limit,),
-    )
+    rows = [ShipmentRow(*row) for row in fetch_all_tuples(SHIPMENTS_LIST_SQL, (limit,))]
+    return Response(content=msgspec.json.encode(rows), media_type="application/json")
+
+# /api/shipments/export- Same rows as /api/shipments, streamed as NDJSON (one shipment per line) for large limits.
+@app.get("/api/shipments/export")
+def export_shipments(limit: int = Query(10000, ge=1, le=50000)):
+    if not EXPORT_SLOTS.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports in progress. Please try again shortly.",
+        )
+    body = fetch_stream(SHIPMENTS_LIST_SQL, (limit,))
+    # Free the slot once the stream is finished or dropped (including a client that disconnects early)
+    weakref.finalize(body, EXPORT_SLOTS.release)
+    return StreamingResponse(iterate_stream(body), media_type="application/x-ndjson")
 
 # /api/shipments/summary- This endpoint provides a summary of the current shipment statuses, including per-status counts and on-time delivery rate.
-@app.get("/api/shipments/summary")
-def shipments_summary():
-    row = fetch_one(
-        """
-            SELECT
-            SUM(CASE WHEN current_status = 'BOOKED' THEN 1 ELSE 0 END) AS booked,
-            SUM(CASE WHEN current_status = 'PICKED_UP' THEN 1 ELSE 0 END) AS picked_up,
-            SUM(CASE WHEN current_status = 'IN_TRANSIT' THEN 1 ELSE 0 END) AS in_transit,
-            SUM(CASE WHEN current_status = 'OUT_FOR_DELIVERY' THEN 1 ELSE 0 END) AS out_for_delivery,
-            SUM(CASE WHEN current_status = 'DELAYED' THEN 1 ELSE 0 END) AS delayed_count,
-            SUM(CASE WHEN has_exception = 1 THEN 1 ELSE 0 END) AS exceptions,
-            SUM(CASE WHEN actual_delivery_date IS NOT NULL
-                AND expected_delivery_date IS NOT NULL
-                AND actual_delivery_date <= expected_delivery_date
-            THEN 1 ELSE 0 END) AS on_time_deliveries,
-            SUM(CASE WHEN actual_delivery_date IS NOT NULL THEN 1 ELSE 0 END) AS delivered_total
-            FROM shipments
-        """,
-        (),
-    )
+# Per-status counts come from the ix_ship_status index instead of evaluating CASEs over every row
+SUMMARY_STATUS_SQL = "SELECT current_status, COUNT(*) AS c FROM shipments GROUP BY current_status"
+SUMMARY_EXCEPTIONS_SQL = "SELECT COUNT(*) AS c FROM shipments WHERE has_exception = 1"
+SUMMARY_DELIVERIES_SQL = """
+    SELECT
+        SUM(actual_delivery_date <= expected_delivery_date) AS on_time_deliveries,
+        COUNT(*) AS delivered_total
+    FROM shipments
+    WHERE actual_delivery_date IS NOT NULL
+"""
 
-    if not row:
-        return {"booked": 0, "picked_up": 0, "in_transit": 0, "out_for_delivery": 0,
-                "delayed_shipments": 0, "exceptions": 0, "on_time_rate": 0.0}
+def build_summary(status_rows: List[Dict[str, Any]], exceptions: Optional[Dict[str, Any]],
+                  deliveries: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    status_counts = {row["current_status"]: int(row["c"] or 0) for row in status_rows}
 
-    delivered_total = int(row.get("delivered_total") or 0)
-    on_time = int(row.get("on_time_deliveries") or 0)
+    delivered_total = int((deliveries or {}).get("delivered_total") or 0)
+    on_time = int((deliveries or {}).get("on_time_deliveries") or 0)
     on_time_rate = round((on_time / delivered_total) * 100, 1) if delivered_total > 0 else 0.0
 
     return {
-        "booked": int(row.get("booked") or 0),
-        "picked_up": int(row.get("picked_up") or 0),
-        "in_transit": int(row.get("in_transit") or 0),
-        "out_for_delivery": int(row.get("out_for_delivery") or 0),
-        "delayed_shipments": int(row.get("delayed_count") or 0),
-        "exceptions": int(row.get("exceptions") or 0),
+        "booked": status_counts.get("BOOKED", 0),
+        "picked_up": status_counts.get("PICKED_UP", 0),
+        "in_transit": status_counts.get("IN_TRANSIT", 0),
+        "out_for_delivery": status_counts.get("OUT_FOR_DELIVERY", 0),
+        "delayed_shipments": status_counts.get("DELAYED", 0),
+        "exceptions": int((exceptions or {}).get("c") or 0),
         "on_time_rate": on_time_rate,
     }
 
+@app.get("/api/shipments/summary")
+@ttl_cached
+def shipments_summary():
+    return build_summary(
+        fetch_all(SUMMARY_STATUS_SQL),
+        fetch_one(SUMMARY_EXCEPTIONS_SQL, ()),
+        fetch_one(SUMMARY_DELIVERIES_SQL, ()),
+    )
+
 # for charts, we can add APIs like: This endpoint returns the count of shipments booked each day over the last 30 days, which can be used to visualize booking trends.
+TREND_SQL = """
+    SELECT
+        DATE(booking_date) AS day,
+        COUNT(*) AS value
+    FROM shipments
+    GROUP BY DATE(booking_date)
+    ORDER BY DATE(booking_date)
+"""
+
 @app.get("/api/shipments/trend")
+@ttl_cached
 def shipments_trend():
-    return fetch_all(
-        """
-        SELECT
-            DATE(booking_date) AS day,
-            COUNT(*) AS value
-        FROM shipments
-        GROUP BY DATE(booking_date)
-        ORDER BY DATE(booking_date)
-        """
-    )
+    return fetch_all(TREND_SQL)
 
 # /api/shipments/{shipment_id} - Returns full detail for a single shipment including vendor, consignee, package, and booking info.
+SHIPMENT_DETAIL_SQL = """
+    SELECT
+        s.id AS shipment_id,
+        a.awb_number,
+        s.origin_city,
+        s.destination_city,
+        s.destination_state,
+        s.destination_pincode,
+        s.current_status,
+        s.expected_delivery_date,
+        s.actual_delivery_date,
+        s.booking_date,
+        s.has_exception,
+        s.exception_type,
+        s.exception_notes,
+        s.consignee_name,
+        s.consignee_address,
+        s.product_type,
+        s.description,
+        s.weight_kg,
+        s.number_of_boxes,
+        s.service_type,
+        s.booking_id,
+        h.hub_code AS current_hub_code,
+        h.hub_name AS current_hub_name,
+        v.name AS vendor_name,
+        COALESCE(s.last_status_update, s.updated_ts) AS last_updated_ts
+    FROM shipments s
+    JOIN awb_numbers a ON a.id = s.awb_id
+    LEFT JOIN hubs h ON h.id = s.current_hub_id
+    LEFT JOIN vendors v ON v.id = s.assigned_vendor_id
+    WHERE s.id = %s
+"""
+
 @app.get("/api/shipments/{shipment_id}")
 def get_shipment_detail(shipment_id: int):
-    row = fetch_one(
-        """
-        SELECT
-            s.id AS shipment_id,
-            a.awb_number,
-            s.origin_city,
-            s.destination_city,
-            s.destination_state,
-            s.destination_pincode,
-            s.current_status,
-            s.expected_delivery_date,
-            s.actual_delivery_date,
-            s.booking_date,
-            s.has_exception,
-            s.exception_type,
-            s.exception_notes,
-            s.consignee_name,
-            s.consignee_address,
-            s.product_type,
-            s.description,
-            s.weight_kg,
-            s.number_of_boxes,
-            s.service_type,
-            s.booking_id,
-            h.hub_code AS current_hub_code,
-            h.hub_name AS current_hub_name,
-            v.name AS vendor_name,
-            COALESCE(s.last_status_update, s.updated_ts) AS last_updated_ts
-        FROM shipments s
-        JOIN awb_numbers a ON a.id = s.awb_id
-        LEFT JOIN hubs h ON h.id = s.current_hub_id
-        LEFT JOIN vendors v ON v.id = s.assigned_vendor_id
-        WHERE s.id = %s
-        """,
-        (shipment_id,),
-    )
+    row = fetch_one(SHIPMENT_DETAIL_SQL, (shipment_id,))
     if not row:
         raise HTTPException(status_code=404, detail=f"Shipment {shipment_id} not found")
     return row
 
 # This endpoint returns the count of exceptions grouped by their type, ordered by the most common exception types first.
+EXCEPTIONS_BY_TYPE_SQL = """
+    SELECT
+        exception_type AS type,
+        COUNT(*) AS value
+    FROM shipments
+    WHERE has_exception = 1
+    GROUP BY exception_type
+    ORDER BY value DESC
+"""
+
 @app.get("/api/exceptions/by-type")
+@ttl_cached
 def exceptions_by_type():
-    return fetch_all(
-        """
-        SELECT
-            exception_type AS type,
-            COUNT(*) AS value
-        FROM shipments
-        WHERE has_exception = 1
-        GROUP BY exception_type
-        ORDER BY value DESC
-        """
-    )
+    return fetch_all(EXCEPTIONS_BY_TYPE_SQL)
 
 # This endpoint returns the status of all hubs, including whether they are operational, congested (20 or more shipments currently at the hub), or down (is_active = 0).
+# Status is precomputed on the hubs table (see sql/hub_status.sql), so this never touches shipments.
+HUBS_STATUS_SQL = """
+    SELECT
+        hub_code,
+        hub_name,
+        city,
+        pincode,
+        status,
+        COALESCE(updated_ts, created_ts) AS last_updated_ts
+    FROM hubs
+    ORDER BY hub_code
+    LIMIT %s
+"""
+
 @app.get("/api/hubs/status")
+@ttl_cached
 def hubs_status(limit: int = 50):
-    return fetch_all(
-        """
-        SELECT
-            h.hub_code,
-            h.hub_name,
-            h.city,
-            h.pincode,
-            CASE
-                WHEN h.is_active = 0 THEN 'DOWN'
-                WHEN COUNT(s.id) >= 20 THEN 'CONGESTED'
-                ELSE 'OPERATIONAL'
-            END AS status,
-            COALESCE(h.updated_ts, h.created_ts) AS last_updated_ts
-        FROM hubs h
-        LEFT JOIN shipments s ON s.current_hub_id = h.id
-        GROUP BY h.id, h.hub_code, h.hub_name, h.city, h.pincode, h.is_active, h.updated_ts, h.created_ts
-        ORDER BY h.hub_code
-        LIMIT %s
-        """,
-        (limit,),
-    )
+    return fetch_all(HUBS_STATUS_SQL, (limit,))
+
+# /api/dashboard- All DashboardHome aggregates (summary, trend, exceptions by type) in one response.
+# The statements are sent together in a single multi-statement roundtrip on one pooled connection.
+@app.get("/api/dashboard")
+@ttl_cached
+def dashboard():
+    status_rows, exceptions, deliveries, trend, by_type = fetch_sets([
+        SUMMARY_STATUS_SQL, SUMMARY_EXCEPTIONS_SQL, SUMMARY_DELIVERIES_SQL,
+        TREND_SQL, EXCEPTIONS_BY_TYPE_SQL,
+    ])
+    return {
+        "summary": build_summary(status_rows, exceptions[0] if exceptions else None,
+                                 deliveries[0] if deliveries else None),
+        "trend": trend,
+        "by_type": by_type,
+    }
+
+DELAYED_SHIPMENTS_SQL = """
+    SELECT
+        s.id AS shipment_id,
+        a.awb_number,
+        s.origin_city,
+        s.destination_city,
+        s.current_status,
+        s.expected_delivery_date AS eta,
+        COALESCE(s.last_status_update, s.updated_ts) AS last_updated
+    FROM shipments s
+    JOIN awb_numbers a ON a.id = s.awb_id
+    WHERE s.current_status = 'DELAYED'
+    ORDER BY s.expected_delivery_date ASC
+"""
 
 @app.get("/api/shipments/delayed")
 def get_delayed_shipments():
-    return fetch_all(
-        """
-        SELECT
-            s.id AS shipment_id,
-            a.awb_number,
-            s.origin_city,
-            s.destination_city,
-            s.current_status,
-            s.expected_delivery_date AS eta,
-            COALESCE(s.last_status_update, s.updated_ts) AS last_updated
-        FROM shipments s
-        JOIN awb_numbers a ON a.id = s.awb_id
-        WHERE s.current_status = 'DELAYED'
-        ORDER BY s.expected_delivery_date ASC
-        """,
-        (),
-    )
\ No newline at end of file
+    return fetch_all(DELAYED_SHIPMENTS_SQL, ())
\ No newline at end of file
@@ -0,0 +1,31 @@
+-- Denormalized hub load for /api/hubs/status, so the endpoint reads hubs only
+-- instead of joining and grouping the whole shipments table on every poll.
+-- Apply once before deploying a backend that reads hubs.status:
+--   mysql -h $MYSQL_HOST -u $MYSQL_USER -p $MYSQL_DB < sql/hub_status.sql
+
+ALTER TABLE hubs
+    ADD COLUMN shipment_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN status ENUM('DOWN', 'CONGESTED', 'OPERATIONAL') AS (
+        CASE
+            WHEN is_active = 0 THEN 'DOWN'
+            WHEN shipment_count >= 20 THEN 'CONGESTED'
+            ELSE 'OPERATIONAL'
+        END
+    ) VIRTUAL;
+
+-- Backfill from current data
+UPDATE hubs h
+SET h.shipment_count = (SELECT COUNT(*) FROM shipments s WHERE s.current_hub_id = h.id);
+
+-- Keep shipment_count current as shipments arrive at, move between, or leave hubs
+CREATE TRIGGER trg_ship_hub_insert AFTER INSERT ON shipments FOR EACH ROW
+    UPDATE hubs SET shipment_count = shipment_count + 1 WHERE id = NEW.current_hub_id;
+
+CREATE TRIGGER trg_ship_hub_update AFTER UPDATE ON shipments FOR EACH ROW
+    UPDATE hubs
+    SET shipment_count = shipment_count + (id <=> NEW.current_hub_id) - (id <=> OLD.current_hub_id)
+    WHERE id IN (OLD.current_hub_id, NEW.current_hub_id)
+      AND NOT (OLD.current_hub_id <=> NEW.current_hub_id);
+
+CREATE TRIGGER trg_ship_hub_delete AFTER DELETE ON shipments FOR EACH ROW
+    UPDATE hubs SET shipment_count = shipment_count - 1 WHERE id = OLD.current_hub_id;
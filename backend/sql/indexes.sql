@@ -0,0 +1,28 @@
+-- Indexes backing the queries in main.py.
+-- The schema itself lives in the shared MySQL database; apply this file once against it:
+--   mysql -h $MYSQL_HOST -u $MYSQL_USER -p $MYSQL_DB < sql/indexes.sql
+
+-- /api/shipments/summary: per-status counts and on-time rate
+-- (has_exception = 1 filters use the ix_ship_exc_sort prefix below)
+CREATE INDEX ix_ship_status ON shipments (current_status);
+CREATE INDEX ix_ship_dates ON shipments (actual_delivery_date, expected_delivery_date);
+
+-- /api/exceptions/live and /api/shipments: ORDER BY COALESCE(...) can't use an index,
+-- so the sort key is stored as a generated column and indexed directly.
+-- Apply this before deploying a backend that orders by sort_ts.
+-- ix_ship_exc_sort also serves the exception count and /api/exceptions/by-type.
+ALTER TABLE shipments
+    ADD COLUMN sort_ts DATETIME AS (COALESCE(last_status_update, updated_ts)) STORED;
+CREATE INDEX ix_ship_exc_sort ON shipments (has_exception, sort_ts DESC);
+CREATE INDEX ix_ship_sort ON shipments (sort_ts DESC);
+
+-- /api/pod/search: leading-wildcard LIKE can't use a B-tree, so AWB numbers and POD URLs
+-- get ngram FULLTEXT indexes (substring search on short codes; default ngram_token_size=2).
+-- The ngram parser drops every token containing a stopword, and InnoDB's default list has
+-- single letters like 'a' and 'i', so with 2-char tokens most of "POD_Shipment_114.pdf" would
+-- never be indexed. Stopwords are read when the index is built, so turn them off for this session
+-- first. If these indexes are ever rebuilt (e.g. OPTIMIZE TABLE with innodb_optimize_fulltext_only),
+-- do it with the same setting.
+SET SESSION innodb_ft_enable_stopword = 0;
+ALTER TABLE awb_numbers ADD FULLTEXT INDEX ft_awb (awb_number) WITH PARSER ngram;
+ALTER TABLE shipments ADD FULLTEXT INDEX ft_pod (pod_document_url) WITH PARSER ngram;
@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+from contextlib import asynccontextmanager
 import httpx
 from groq import Groq
 from fastapi import FastAPI
@@ -23,8 +25,22 @@ MAIN_BACKEND = os.getenv("MAIN_BACKEND_URL", "http://backend:8000")
 # Frontend URL for CORS
 FRONTEND_URLS = os.getenv("FRONTEND_URL", "http://localhost:3000").split(",")
 
+# One shared HTTP client for all backend calls, so connections to the backend
+# are kept alive and reused instead of being opened for every tool call
+HTTP = httpx.AsyncClient(
+    base_url=MAIN_BACKEND,
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the shared HTTP client on shutdown
+    await HTTP.aclose()
+
 # Create our FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Allow React frontend to talk to this service
 app.add_middleware(
@@ -36,24 +52,20 @@ app.add_middleware(
 )
 
 async def fetch_summary():
-    async with httpx.AsyncClient(timeout=10.0) as http_client:
-        res = await http_client.get(f"{MAIN_BACKEND}/api/shipments/summary")
-        return res.json()
+    res = await HTTP.get("/api/shipments/summary")
+    return res.json()
 
 async def fetch_exceptions(limit: int = 10):
-    async with httpx.AsyncClient() as http_client:
-        res = await http_client.get(f"{MAIN_BACKEND}/api/exceptions/live?limit={limit}")
-        return res.json()
+    res = await HTTP.get("/api/exceptions/live", params={"limit": limit})
+    return res.json()
 
 async def fetch_vendors():
-    async with httpx.AsyncClient() as http_client:
-        res = await http_client.get(f"{MAIN_BACKEND}/api/vendors")
-        return res.json()
+    res = await HTTP.get("/api/vendors")
+    return res.json()
     
 async def fetch_delayed_shipments():
-    async with httpx.AsyncClient() as http_client:
-        res = await http_client.get(f"{MAIN_BACKEND}/api/shipments/delayed")
-        return res.json()
+    res = await HTTP.get("/api/shipments/delayed")
+    return res.json()
     
 
 # These are the tools we expose to Groq
@@ -220,6 +232,8 @@ async def chat(req: ChatRequest):
 
         # Execute ALL tools Groq requested
         # Groq can request multiple tools at once!
+        # They are independent fetches, so we run them concurrently
+        tool_coros = []
         for tool_call in first_message.tool_calls:
             tool_name = tool_call.function.name
 
@@ -235,10 +249,13 @@ async def chat(req: ChatRequest):
             if tool_args is None:
                 tool_args = {}
 
-            # Actually run the tool and get the data
-            tool_result = await execute_tool(tool_name, tool_args)
+            tool_coros.append(execute_tool(tool_name, tool_args))
+
+        # Actually run the tools and get the data (results come back in request order)
+        tool_results = await asyncio.gather(*tool_coros)
 
-            # Add tool result to messages so Groq can see it
+        # Add tool results to messages so Groq can see them
+        for tool_call, tool_result in zip(first_message.tool_calls, tool_results):
             messages.append({
                 "role": "tool",
                 "tool_call_id": tool_call.id,
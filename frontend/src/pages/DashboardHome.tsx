@@ -61,13 +61,6 @@ function safeTime(ts?: string | null) {
 export default function DashboardHome() {
     const [summary, setSummary] = useState<Summary | null>(null);
     const [loadingSummary, setLoadingSummary] = useState(false);
-    useEffect(() => {
-        setLoadingSummary(true);
-        api.get("/api/shipments/summary")
-        .then((res) => setSummary(res.data))
-        .catch((err) => console.error("Failed to fetch summary:", err))
-        .finally(() => setLoadingSummary(false));
-    }, []);
 
     const nav = useNavigate();
     // API-driven
@@ -96,11 +89,18 @@ export default function DashboardHome() {
     // Charts (keeping mock for now)- we'll connect these to our local API endpoints in the next steps
     const [shipmentsTrend, setShipmentsTrend] = useState<any[]>([]);
     const [exceptionsByType, setExceptionsByType] = useState<any[]>([]);
+
+    // Summary and chart data come from one /api/dashboard call (one DB roundtrip on the backend)
     useEffect(() => {
-        api.get("/api/shipments/trend").then(res => setShipmentsTrend(res.data));
-    }, []);
-    useEffect(() => {
-        api.get("/api/exceptions/by-type").then(res => setExceptionsByType(res.data));
+        setLoadingSummary(true);
+        api.get("/api/dashboard")
+        .then((res) => {
+            setSummary(res.data.summary);
+            setShipmentsTrend(res.data.trend);
+            setExceptionsByType(res.data.by_type);
+        })
+        .catch((err) => console.error("Failed to fetch dashboard:", err))
+        .finally(() => setLoadingSummary(false));
     }, []);
     
     // Chart configurations